@@ -0,0 +1,28 @@
+# agent/async_loop.py
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Coroutine, Optional
+
+
+class AsyncLoopThread:
+    """Event loop running forever on a daemon thread
+
+    Streamlit reruns the script on every interaction, so asyncio.run would create and
+    tear down a loop (and every connection bound to it) each time. Synchronous code
+    submits coroutines here instead, keeping one loop and its keep-alive pools alive.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="async-loop", daemon=True)
+        self._thread.start()
+
+    def submit(self, coro: Coroutine[Any, Any, Any], timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the loop and block until it returns"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def spawn(self, coro: Coroutine[Any, Any, Any]) -> Future:
+        """Schedule a coroutine on the loop without waiting for it"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
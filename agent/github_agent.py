@@ -3,17 +3,28 @@
 import os
 import requests
 from openai import OpenAI
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Set up OpenAI client
 openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
+# Shared keep-alive session for MCP calls; queries are read-only so POSTs are retried too
+_session = requests.Session()
+_session.mount("http://", HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=[502, 503, 504], allowed_methods=None)
+))
+
 # Custom function to query MCP server
 def call_mcp_tool(input_text):
     try:
-        res = requests.post(
+        res = _session.post(
             "http://localhost:5001/query",
             headers={"Authorization": f"Bearer {os.getenv('GITHUB_TOKEN')}"},
             json={"query": input_text},
+            timeout=30,
         )
         return res.json()["response"]
     except Exception as e:
@@ -0,0 +1,140 @@
+# agent/llm_cache.py
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from cachetools import LRUCache
+
+# Disk cache location and freshness window for stored completions
+CACHE_DIR = os.getenv("GH_AGENT_CACHE_DIR", os.path.expanduser("~/.cache/gh_agent"))
+CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+
+# In-process copy of recently used entries, updated one key at a time by store()
+_memory = LRUCache(maxsize=256)
+_memory_lock = threading.Lock()
+
+
+def cache_key(model: str, messages: List[Dict[str, Any]], temperature: float, **kwargs) -> str:
+    """SHA-256 of the request parameters that determine the completion"""
+    payload = json.dumps([model, messages, temperature, kwargs], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _cache_path(key: str) -> str:
+    return os.path.join(CACHE_DIR, f"{key}.json")
+
+
+def _load(key: str) -> Optional[Dict[str, Any]]:
+    """Cache entry for key from memory, falling back to disk"""
+    with _memory_lock:
+        entry = _memory.get(key)
+    if entry is not None:
+        return entry
+
+    try:
+        with open(_cache_path(key), encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    with _memory_lock:
+        _memory[key] = entry
+    return entry
+
+
+def store(key: str, response: Dict[str, Any]) -> None:
+    """Write a completion (as returned by model_dump) to the memory and disk caches"""
+    entry = {"created_at": time.time(), "response": response}
+    with _memory_lock:
+        _memory[key] = entry
+
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(_cache_path(key), "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+    except OSError:
+        pass
+
+
+def lookup(key: str) -> Optional[Dict[str, Any]]:
+    """Fresh cached response for key, or None"""
+    entry = _load(key)
+    try:
+        if entry is not None and time.time() - entry["created_at"] < CACHE_TTL_SECONDS:
+            return entry["response"]
+    except (KeyError, TypeError):
+        pass
+    return None
+
+
+def cached_chat(client, model: str, messages: List[Dict[str, Any]], temperature: float,
+                use_cache: bool = True, **kwargs) -> Dict[str, Any]:
+    """Chat completion memoized by request content, returned as a plain dict
+
+    Extra keyword arguments (e.g. tools, tool_choice) are forwarded to the API
+    and take part in the cache key.
+    """
+    key = cache_key(model, messages, temperature, **kwargs)
+
+    if use_cache:
+        cached = lookup(key)
+        if cached is not None:
+            return cached
+
+    response = client.chat.completions.create(
+        model=model,
+        messages=messages,
+        temperature=temperature,
+        **kwargs
+    ).model_dump()
+
+    store(key, response)
+    return response
+
+
+def stream_chat(client, model: str, messages: List[Dict[str, Any]], temperature: float,
+                use_cache: bool = True, **kwargs) -> Iterator[str]:
+    """Streaming counterpart of cached_chat, yielding content deltas
+
+    A cache hit yields the stored content in one piece. A streamed completion is
+    stored under the same key as cached_chat once it finishes, so both share entries.
+    """
+    key = cache_key(model, messages, temperature, **kwargs)
+
+    if use_cache:
+        cached = lookup(key)
+        if cached is not None:
+            yield cached["choices"][0]["message"]["content"] or ""
+            return
+
+    stream = client.chat.completions.create(
+        model=model,
+        messages=messages,
+        temperature=temperature,
+        stream=True,
+        **kwargs
+    )
+
+    parts = []
+    finish_reason = None
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        choice = chunk.choices[0]
+        finish_reason = choice.finish_reason or finish_reason
+        delta = choice.delta.content or ""
+        parts.append(delta)
+        yield delta
+
+    store(key, {
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": "".join(parts)},
+            "finish_reason": finish_reason
+        }]
+    })
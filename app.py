@@ -1,40 +1,180 @@
 import streamlit as st
 import asyncio
+import hashlib
 import json
 import os
-from typing import Dict, List, Any, Optional
+import re
+from typing import Dict, Iterator, List, Any, Optional
 import subprocess
+import threading
 import time
+from cachetools import TTLCache
 from dataclasses import dataclass
 from openai import OpenAI
+import httpx
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime
 
+from agent.async_loop import AsyncLoopThread
+from agent.llm_cache import CACHE_DIR, cached_chat, stream_chat
+
 @dataclass
 class MCPResponse:
     """Structure for MCP server responses"""
     success: bool
     data: Any
     error: Optional[str] = None
+    
+    @property
+    def is_error(self) -> bool:
+        """True for failed calls and for the error bodies the server returns with HTTP 200"""
+        return not self.success or (isinstance(self.data, dict) and "error" in self.data)
+
+class RepeatedFailureError(Exception):
+    """Raised instead of re-running a tool call that keeps failing"""
 
 class MCPClient:
     """Client for communicating with MCP server"""
     
+    # Tool results shared by every client in the process, keyed by server, tool and arguments.
+    # Content tools live longer and are keyed on the head commit so a push invalidates them;
+    # file contents are additionally kept on disk, keyed on the last commit touching the file.
+    CONTENT_TOOLS = {"search_code"}
+    FILE_CACHE_DIR = os.path.join(CACHE_DIR, "files")
+    # Upper bound on file reads in flight per client, however many a plan or bulk fetch asks for
+    MAX_FILE_FETCH_WORKERS = 10
+    _result_cache = TTLCache(maxsize=512, ttl=300)
+    _content_cache = TTLCache(maxsize=512, ttl=24 * 60 * 60)
+    _cache_lock = threading.Lock()
+    
     def __init__(self, server_url: str = "http://localhost:3000"):
         self.server_url = server_url
         self.session = requests.Session()
+        # Synchronous keep-alive session for non-tool endpoints, retrying transient gateway errors
+        adapter = HTTPAdapter(
+            pool_connections=16,
+            pool_maxsize=32,
+            max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=[502, 503, 504], allowed_methods=None)
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # Tool calls go through an async client so a whole plan can be awaited with asyncio.gather
+        self._aclient = httpx.AsyncClient(
+            base_url=server_url,
+            timeout=30,
+            # limits only take effect on the transport when one is passed explicitly
+            transport=httpx.AsyncHTTPTransport(
+                retries=3,
+                limits=httpx.Limits(max_connections=32, max_keepalive_connections=16)
+            )
+        )
+        self._file_fetch_slots = asyncio.Semaphore(self.MAX_FILE_FETCH_WORKERS)
     
-    def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> MCPResponse:
-        """Call a tool on the MCP server"""
+    async def warm(self) -> None:
+        """Open a pooled connection to the server ahead of the first tool call"""
         try:
-            response = self.session.post(
-                f"{self.server_url}/tools/{tool_name}",
-                json={"arguments": arguments},
-                timeout=30
+            await self._aclient.head("/health", timeout=5)
+        except Exception:
+            pass
+    
+    async def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> MCPResponse:
+        """Call a tool on the MCP server, serving repeated calls from cache"""
+        if tool_name == "get_file_contents":
+            return await self.get_file_contents_cached(
+                arguments.get("owner"), arguments.get("repo"), arguments.get("path"), arguments.get("ref")
             )
+        
+        key = (self.server_url, tool_name, json.dumps(arguments, sort_keys=True))
+        cache = self._result_cache
+        
+        if tool_name in self.CONTENT_TOOLS:
+            head_sha = await self._head_sha(arguments)
+            if head_sha is None:
+                return await self._post_tool(tool_name, arguments)
+            key += (head_sha,)
+            cache = self._content_cache
+        
+        with self._cache_lock:
+            cached = cache.get(key)
+        if cached is not None:
+            return cached
+        
+        result = await self._post_tool(tool_name, arguments)
+        if not result.is_error:
+            with self._cache_lock:
+                cache[key] = result
+        return result
+    
+    async def bulk_get_file_contents(self, owner: str, repo: str, paths: List[str],
+                                     ref: Optional[str] = None) -> List[MCPResponse]:
+        """Read several files concurrently, returning results in path order"""
+        return await asyncio.gather(*[self.get_file_contents_cached(owner, repo, path, ref) for path in paths])
+    
+    async def get_file_contents_cached(self, owner: str, repo: str, path: str, ref: Optional[str] = None) -> MCPResponse:
+        """Read a file, reusing the on-disk copy saved for the last commit that touched it"""
+        async with self._file_fetch_slots:
+            return await self._get_file_contents_cached(owner, repo, path, ref)
+    
+    async def _get_file_contents_cached(self, owner: str, repo: str, path: str, ref: Optional[str]) -> MCPResponse:
+        arguments = {"owner": owner, "repo": repo, "path": path}
+        if ref:
+            arguments["ref"] = ref
+        
+        if not (owner and repo and path):
+            return await self._post_tool("get_file_contents", arguments)
+        
+        commit_sha = await self._head_sha(arguments, path=path)
+        if commit_sha is None:
+            return await self._post_tool("get_file_contents", arguments)
+        
+        digest = hashlib.sha256(json.dumps([owner, repo, path, commit_sha]).encode()).hexdigest()
+        cache_path = os.path.join(self.FILE_CACHE_DIR, f"{digest}.json")
+        try:
+            with open(cache_path, "rb") as f:
+                return MCPResponse(success=True, data=orjson.loads(f.read()))
+        except (OSError, orjson.JSONDecodeError):
+            pass
+        
+        result = await self._post_tool("get_file_contents", arguments)
+        if not result.is_error:
+            try:
+                os.makedirs(self.FILE_CACHE_DIR, exist_ok=True)
+                with open(cache_path, "wb") as f:
+                    f.write(orjson.dumps(result.data))
+            except OSError:
+                pass
+        return result
+    
+    async def _head_sha(self, arguments: Dict[str, Any], path: Optional[str] = None) -> Optional[str]:
+        """Latest commit SHA of the ref a content tool reads from (optionally touching path), if it can be resolved"""
+        commit_args = {"owner": arguments.get("owner"), "repo": arguments.get("repo"), "per_page": 1}
+        if arguments.get("ref"):
+            commit_args["sha"] = arguments["ref"]
+        if path:
+            commit_args["path"] = path
+        
+        result = await self.call_tool("get_commits", commit_args)
+        if result.success and isinstance(result.data, list) and result.data:
+            return result.data[0].get("sha")
+        return None
+    
+    @classmethod
+    def cache_clear(cls) -> None:
+        """Drop all cached tool results"""
+        with cls._cache_lock:
+            cls._result_cache.clear()
+            cls._content_cache.clear()
+    
+    async def _post_tool(self, tool_name: str, arguments: Dict[str, Any]) -> MCPResponse:
+        """Call a tool on the MCP server"""
+        try:
+            response = await self._aclient.post(f"/tools/{tool_name}", json={"arguments": arguments})
             
             if response.status_code == 200:
-                data = response.json()
+                data = orjson.loads(response.content)
                 return MCPResponse(success=True, data=data)
             else:
                 return MCPResponse(
@@ -56,113 +196,358 @@ class MCPClient:
         except Exception as e:
             return MCPResponse(success=False, data=None, error=str(e))
 
+class MCPClientWrapper:
+    """Synchronous facade over MCPClient that runs its coroutines on a shared event loop"""
+    
+    def __init__(self, mcp_client: MCPClient, loop_thread: AsyncLoopThread):
+        self.mcp_client = mcp_client
+        self.loop_thread = loop_thread
+        self.loop_thread.spawn(self.mcp_client.warm())
+    
+    def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> MCPResponse:
+        """Call a single tool on the MCP server"""
+        return self.call_tools([{"tool": tool_name, "arguments": arguments}])[0]
+    
+    def call_tools(self, tool_calls: List[Dict]) -> List[MCPResponse]:
+        """Call several tools concurrently, returning results in request order"""
+        return self.loop_thread.submit(self._gather(tool_calls))
+    
+    async def _gather(self, tool_calls: List[Dict]) -> List[MCPResponse]:
+        # Exceptions (e.g. malformed model arguments) become failed results, never propagate
+        results = await asyncio.gather(
+            *[self.mcp_client.call_tool(tool_call["tool"], tool_call["arguments"]) for tool_call in tool_calls],
+            return_exceptions=True
+        )
+        return [
+            result if isinstance(result, MCPResponse) else MCPResponse(success=False, data=None, error=str(result))
+            for result in results
+        ]
+    
+    def bulk_get_file_contents(self, owner: str, repo: str, paths: List[str],
+                               ref: Optional[str] = None) -> List[MCPResponse]:
+        """Read several files concurrently, returning results in path order"""
+        return self.loop_thread.submit(self.mcp_client.bulk_get_file_contents(owner, repo, paths, ref))
+    
+    def cache_clear(self) -> None:
+        """Drop all cached tool results"""
+        self.mcp_client.cache_clear()
+    
+    def list_tools(self) -> MCPResponse:
+        """List available tools from MCP server"""
+        return self.mcp_client.list_tools()
+
+# Fixed prompt text, built once at import rather than on every call
+ANALYZE_SYSTEM_PROMPT = (
+    "You are an AI agent that analyzes GitHub repositories using MCP tools.\n\n"
+    "Call the MCP tools needed to answer the user's query. Request all independent "
+    "tool calls at once so they can run in parallel. If the query can be answered "
+    "without repository data, answer it directly using markdown."
+)
+ANALYZE_SYSTEM_MESSAGE = {"role": "system", "content": ANALYZE_SYSTEM_PROMPT}
+BATCH_SYSTEM_PROMPT_TMPL = "You are an AI assistant analyzing GitHub repository data. {instruction}"
+BATCH_USER_PROMPT_TMPL = (
+    'Return JSON: {{"answers": [...]}} with exactly {count} strings, one per item, in order.\n'
+    "Items:\n{items}"
+)
+
+# Prompt budget for tool output fed back to the model: each result is cut to
+# TOOL_RESULT_MAX_CHARS, and the oldest results are dropped past TOOL_CONTEXT_MAX_CHARS
+TOOL_RESULT_MAX_CHARS = 4000
+TOOL_CONTEXT_MAX_CHARS = 60000
+
+def _truncate(text: str, limit: int) -> str:
+    """Keep the head and tail of text within limit characters"""
+    if len(text) <= limit:
+        return text
+    # Size the marker for the widest possible count so the result stays within limit
+    kept = max(limit - len(f"…[truncated {len(text)} chars]…"), 0)
+    head = kept // 2
+    tail = kept - head
+    marker = f"…[truncated {len(text) - kept} chars]…"
+    return text[:head] + marker + (text[-tail:] if tail else "")
+
+# Retrieval-style queries go to the small model; reasoning-heavy ones to the larger one
+COMPLEX_QUERY_KEYWORDS = ("analyze", "suggest", "fix", "architecture")
+SIMPLE_MODEL = "gpt-4o-mini"
+COMPLEX_MODEL = "gpt-4o"
+MODEL_CHOICES = ["Auto", SIMPLE_MODEL, COMPLEX_MODEL, "gpt-4"]
+
+def _pick_model(query: str) -> str:
+    """Choose a model from the wording of the query"""
+    words = re.findall(r"[a-z]+", query.lower())
+    if any(word.startswith(keyword) for word in words for keyword in COMPLEX_QUERY_KEYWORDS):
+        return COMPLEX_MODEL
+    return SIMPLE_MODEL
+
+# Shown as buttons in the UI; their planning step is pre-answered by scripts/warm_cache.py
+PREDEFINED_QUERIES = [
+    "What are the latest issues in my repository?",
+    "Show me the contents of the README.md file",
+    "Find all Python files in the repository",
+    "What are the recent commits on the main branch?",
+    "Search for files containing 'add'",
+    "Analyze the code and the issues in the repository and provide suggestions on how it can be fixed"
+]
+
+def _mcp_tool(name: str, description: str, properties: Dict[str, Any], required: List[str]) -> Dict[str, Any]:
+    """OpenAI function-calling schema for an MCP server tool"""
+    return {
+        "type": "function",
+        "function": {
+            "name": name,
+            "description": description,
+            "parameters": {
+                "type": "object",
+                "properties": {"owner": {"type": "string"}, "repo": {"type": "string"}, **properties},
+                "required": ["owner", "repo", *required]
+            }
+        }
+    }
+
+# Mirrors the tool definitions exposed by server.js
+MCP_TOOLS = [
+    _mcp_tool("get_repository_info", "Get basic repository information", {}, []),
+    _mcp_tool("list_issues", "Get repository issues", {
+        "state": {"type": "string", "enum": ["open", "closed", "all"]},
+        "per_page": {"type": "number"}
+    }, []),
+    _mcp_tool("get_file_contents", "Read file contents from repository", {
+        "path": {"type": "string"},
+        "ref": {"type": "string"}
+    }, ["path"]),
+    _mcp_tool("search_files", "Search for files by name or pattern", {
+        "query": {"type": "string"},
+        "path": {"type": "string"}
+    }, ["query"]),
+    _mcp_tool("get_commits", "Get recent commits", {
+        "sha": {"type": "string"},
+        "path": {"type": "string"},
+        "per_page": {"type": "number"}
+    }, []),
+    _mcp_tool("search_code", "Search for code content in repository", {
+        "query": {"type": "string"}
+    }, ["query"]),
+]
+
+# Read-only tools that may run concurrently; anything else runs on its own, in plan order
+PARALLEL_SAFE_TOOLS = {
+    "get_repository_info", "list_issues", "get_file_contents", "search_files", "get_commits", "search_code"
+}
+
+def _tool_batches(tools_to_use: List[Dict]) -> Iterator[List[Dict]]:
+    """Split a plan into runs of parallel-safe calls, with every other call in a batch of its own"""
+    batch = []
+    for tool_config in tools_to_use:
+        if tool_config["tool"] in PARALLEL_SAFE_TOOLS:
+            batch.append(tool_config)
+            continue
+        if batch:
+            yield batch
+            batch = []
+        yield [tool_config]
+    if batch:
+        yield batch
+
 class GitHubAgent:
     """AI Agent for GitHub repository analysis"""
     
-    def __init__(self, openai_api_key: str, github_token: str):
+    # Abort a plan once any of its calls has failed this often within the recent history;
+    # failures older than the cooldown no longer count, so a block lifts on its own
+    MAX_REPEATED_FAILURES = 3
+    FAILURE_HISTORY_WINDOW = 20
+    FAILURE_COOLDOWN_SECONDS = 120
+    
+    def __init__(self, openai_api_key: str, github_token: str, loop_thread: Optional[AsyncLoopThread] = None):
         self.client = OpenAI(api_key=openai_api_key)
         self.github_token = github_token
-        self.mcp_client = MCPClient()
-        
-    def analyze_query(self, query: str) -> Dict[str, Any]:
-        """Analyze user query and determine required actions"""
-        system_prompt = """You are an AI agent that analyzes GitHub repositories using MCP tools.
-        
-        Available MCP tools:
-        - get_repository_info: Get basic repository information
-        - list_issues: Get repository issues
-        - get_file_contents: Read file contents
-        - search_files: Search for files by name or pattern
-        - get_commits: Get recent commits
-        - search_code: Search for code content
-        
-        Based on the user query, determine:
-        1. Which MCP tools to use
-        2. What arguments to pass to each tool
-        3. How to process and present the results
+        self.mcp_client = MCPClientWrapper(MCPClient(), loop_thread or AsyncLoopThread())
+        threading.Thread(target=self._warm, daemon=True).start()
+    
+    def _warm(self) -> None:
+        """Complete the TCP/TLS handshake with the OpenAI API before the first query"""
+        try:
+            self.client.models.list()
+        except Exception:
+            pass
         
-        Return a JSON object with:
-        {
-            "tools_to_use": [{"tool": "tool_name", "arguments": {...}}],
-            "processing_strategy": "description of how to handle results",
-            "response_format": "how to format the final response"
+    @staticmethod
+    def analysis_request(query: str, model: Optional[str] = None) -> Dict[str, Any]:
+        """Chat completion parameters for planning tool calls for a query"""
+        return {
+            "model": model or _pick_model(query),
+            "messages": [
+                ANALYZE_SYSTEM_MESSAGE,
+                {"role": "user", "content": f"Query: {query}"}
+            ],
+            "temperature": 0.1,
+            "tools": MCP_TOOLS
         }
+    
+    def analyze_query(self, query: str, use_cache: bool = True, model: Optional[str] = None) -> Dict[str, Any]:
+        """Ask the model which MCP tools to call, using native tool calling
+
+        The model is picked from the query unless given; the response step reuses it.
         """
+        request = self.analysis_request(query, model)
+        messages = request["messages"]
+        model = request["model"]
         
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"Query: {query}"}
-                ],
-                temperature=0.1
-            )
+            response = cached_chat(self.client, use_cache=use_cache, **request)
+            
+            choice = response["choices"][0]
+            message = choice["message"]
+            
+            if choice["finish_reason"] != "tool_calls" or not message.get("tool_calls"):
+                return {"tools_to_use": [], "model": model, "messages": messages, "answer": message["content"]}
             
-            return json.loads(response.choices[0].message.content)
+            tool_calls = [
+                {"id": call["id"], "type": call["type"], "function": call["function"]}
+                for call in message["tool_calls"]
+            ]
+            messages.append({"role": "assistant", "content": message["content"], "tool_calls": tool_calls})
+            
+            return {
+                "tools_to_use": [
+                    {
+                        "id": call["id"],
+                        "tool": call["function"]["name"],
+                        "arguments": orjson.loads(call["function"]["arguments"] or "{}")
+                    }
+                    for call in tool_calls
+                ],
+                "model": model,
+                "messages": messages
+            }
         except Exception as e:
             return {
                 "tools_to_use": [],
-                "processing_strategy": "error",
-                "response_format": f"Error analyzing query: {str(e)}"
+                "model": model,
+                "messages": messages,
+                "answer": f"Error analyzing query: {str(e)}"
             }
     
+    def analyze_batch(self, items: List[str], instruction: str = "Analyze each item and suggest how it can be fixed.",
+                      use_cache: bool = True) -> List[str]:
+        """Answer several sub-prompts with a single completion instead of one call per item"""
+        if not items:
+            return []
+        
+        numbered = "\n".join(f"{i+1}. {item}" for i, item in enumerate(items))
+        
+        try:
+            response = cached_chat(
+                self.client,
+                # JSON mode is not available on the original gpt-4
+                model=COMPLEX_MODEL,
+                messages=[
+                    {"role": "system", "content": BATCH_SYSTEM_PROMPT_TMPL.format(instruction=instruction)},
+                    {"role": "user", "content": BATCH_USER_PROMPT_TMPL.format(count=len(items), items=numbered)}
+                ],
+                temperature=0.3,
+                use_cache=use_cache,
+                response_format={"type": "json_object"}
+            )
+            
+            answers = json.loads(response["choices"][0]["message"]["content"])["answers"]
+            if len(answers) != len(items):
+                raise ValueError(f"expected {len(items)} answers, got {len(answers)}")
+            return [str(answer) for answer in answers]
+        except Exception as e:
+            return [f"Error analyzing item: {str(e)}"] * len(items)
+    
     def execute_tools(self, tools_to_use: List[Dict]) -> List[MCPResponse]:
-        """Execute the required MCP tools"""
-        results = []
+        """Execute the required MCP tools concurrently, preserving plan order"""
+        if not tools_to_use:
+            return []
+        
+        # Per-session record of (call hash, failed, time) so a failing plan is not replayed forever
+        history = st.session_state.setdefault("tool_history", [])
+        now = time.time()
+        call_hashes = [
+            hashlib.md5(json.dumps(
+                {"tool": tool_config["tool"], "arguments": tool_config["arguments"]}, sort_keys=True
+            ).encode()).hexdigest()
+            for tool_config in tools_to_use
+        ]
+        recent_failures = [
+            call_hash for call_hash, failed, at in history[-self.FAILURE_HISTORY_WINDOW:]
+            if failed and now - at < self.FAILURE_COOLDOWN_SECONDS
+        ]
+        for tool_config, call_hash in zip(tools_to_use, call_hashes):
+            if recent_failures.count(call_hash) >= self.MAX_REPEATED_FAILURES:
+                raise RepeatedFailureError(
+                    f"Tool {tool_config['tool']} failed {self.MAX_REPEATED_FAILURES} times with the same arguments. "
+                    f"Retry after {self.FAILURE_COOLDOWN_SECONDS} seconds, or press 'Clear cache' in the sidebar to reset."
+                )
         
         for tool_config in tools_to_use:
+            st.write(f"🔧 Executing tool: {tool_config['tool']}")
+        
+        # Calls run on the shared loop thread; Streamlit reporting stays on the script thread
+        results = []
+        for batch in _tool_batches(tools_to_use):
+            results.extend(self.mcp_client.call_tools(batch))
+        
+        for tool_config, call_hash, result in zip(tools_to_use, call_hashes, results):
+            if not result.is_error:
+                # A success clears the call's earlier failures
+                history[:] = [entry for entry in history if entry[0] != call_hash]
+            history.append((call_hash, result.is_error, now))
             tool_name = tool_config["tool"]
-            arguments = tool_config["arguments"]
-            
-            st.write(f"🔧 Executing tool: {tool_name}")
-            result = self.mcp_client.call_tool(tool_name, arguments)
-            results.append(result)
-            
-            if result.success:
-                st.success(f"✅ Tool {tool_name} executed successfully")
+            if result.is_error:
+                st.error(f"❌ Tool {tool_name} failed: {result.error or result.data['error']}")
             else:
-                st.error(f"❌ Tool {tool_name} failed: {result.error}")
+                st.success(f"✅ Tool {tool_name} executed successfully")
         
+        del history[:-self.FAILURE_HISTORY_WINDOW]
         return results
     
-    def generate_response(self, query: str, tool_results: List[MCPResponse], processing_strategy: str) -> str:
-        """Generate final response based on tool results"""
+    def generate_response(self, analysis: Dict[str, Any], tool_results: List[MCPResponse],
+                          use_cache: bool = True) -> Iterator[str]:
+        """Stream the final response by feeding tool results back to the model"""
+        if not analysis.get("tools_to_use"):
+            yield analysis.get("answer") or "No tools identified for execution."
+            return
         
-        # Prepare context from tool results
-        context = []
-        for i, result in enumerate(tool_results):
+        contents = []
+        for result in tool_results:
             if result.success:
-                context.append(f"Tool {i+1} Result: {json.dumps(result.data, indent=2)}")
+                contents.append(_truncate(orjson.dumps(result.data).decode(), TOOL_RESULT_MAX_CHARS))
             else:
-                context.append(f"Tool {i+1} Error: {result.error}")
-        
-        context_str = "\n\n".join(context)
+                contents.append(f"Error: {result.error}")
         
-        system_prompt = f"""You are an AI assistant analyzing GitHub repository data.
+        # Newest results win the context budget; every call id still needs a tool message
+        remaining = TOOL_CONTEXT_MAX_CHARS
+        for i in reversed(range(len(contents))):
+            if len(contents[i]) > remaining:
+                contents[i] = "[omitted: tool output exceeded the context budget]"
+            remaining -= len(contents[i])
         
-        Processing strategy: {processing_strategy}
-        
-        Based on the tool results provided, generate a comprehensive and helpful response to the user's query.
-        Format the response in a clear, structured way using markdown.
-        
-        Tool Results:
-        {context_str}
-        """
+        messages = list(analysis["messages"])
+        for tool_config, content in zip(analysis["tools_to_use"], contents):
+            messages.append({"role": "tool", "tool_call_id": tool_config["id"], "content": content})
         
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"Original query: {query}"}
-                ],
-                temperature=0.3
+            yield from stream_chat(
+                self.client,
+                model=analysis.get("model") or COMPLEX_MODEL,
+                messages=messages,
+                temperature=0.3,
+                use_cache=use_cache
             )
-            
-            return response.choices[0].message.content
         except Exception as e:
-            return f"Error generating response: {str(e)}"
+            yield f"Error generating response: {str(e)}"
+
+@st.cache_resource
+def get_loop_thread() -> AsyncLoopThread:
+    """Process-wide event loop shared by all sessions and reruns"""
+    return AsyncLoopThread()
+
+@st.cache_resource
+def get_agent(openai_api_key: str, github_token: str) -> GitHubAgent:
+    """One agent (and its OpenAI and MCP connection pools) per set of credentials"""
+    return GitHubAgent(openai_api_key, github_token, get_loop_thread())
 
 def check_mcp_server():
     """Check if MCP server is running"""
@@ -206,6 +591,17 @@ def main():
         repo_owner = st.text_input("Repository Owner", value="octocat")
         repo_name = st.text_input("Repository Name", value="Hello-World")
         
+        # Model
+        st.selectbox("Model", MODEL_CHOICES, key="model_choice",
+                     help="Auto uses gpt-4o for analysis and suggestions, gpt-4o-mini otherwise")
+        
+        # Caching
+        st.checkbox("Disable LLM cache", key="no_cache")
+        if st.button("Clear cache"):
+            MCPClient.cache_clear()
+            st.session_state.tool_history = []
+            st.success("Tool result cache cleared")
+        
         # MCP Server status
         st.subheader("MCP Server Status")
         if check_mcp_server():
@@ -221,30 +617,24 @@ def main():
         st.warning("Please provide OpenAI API Key and GitHub Token in the sidebar.")
         return
     
-    # Initialize agent
-    agent = GitHubAgent(openai_key, github_token)
+    # Initialize agent (shared across reruns; the cache toggle is per session)
+    agent = get_agent(openai_key, github_token)
+    use_cache = not st.session_state.get("no_cache", False)
+    model_choice = st.session_state.get("model_choice", "Auto")
+    model = None if model_choice == "Auto" else model_choice
     
     # Predefined queries
     st.header("🎯 Predefined Queries")
     
-    predefined_queries = [
-        "What are the latest issues in my repository?",
-        "Show me the contents of the README.md file",
-        "Find all Python files in the repository",
-        "What are the recent commits on the main branch?",
-        "Search for files containing 'add'",
-        "Analyze the code and the issues in the repository and provide suggestions on how it can be fixed"
-    ]
-    
     col1, col2 = st.columns(2)
     
     with col1:
-        for i, query in enumerate(predefined_queries[:3]):
+        for i, query in enumerate(PREDEFINED_QUERIES[:3]):
             if st.button(f"Query {i+1}", key=f"btn_{i}"):
                 st.session_state.selected_query = query
     
     with col2:
-        for i, query in enumerate(predefined_queries[3:], 3):
+        for i, query in enumerate(PREDEFINED_QUERIES[3:], 3):
             if st.button(f"Query {i+1}", key=f"btn_{i}"):
                 st.session_state.selected_query = query
     
@@ -266,7 +656,7 @@ def main():
         with st.spinner("Analyzing query..."):
             # Step 1: Analyze query
             st.subheader("🧠 Query Analysis")
-            analysis = agent.analyze_query(query)
+            analysis = agent.analyze_query(query, use_cache=use_cache, model=model)
             
             with st.expander("View Query Analysis"):
                 st.json(analysis)
@@ -274,28 +664,26 @@ def main():
             # Step 2: Execute tools
             st.subheader("🔧 Tool Execution")
             if analysis.get("tools_to_use"):
-                tool_results = agent.execute_tools(analysis["tools_to_use"])
+                try:
+                    tool_results = agent.execute_tools(analysis["tools_to_use"])
+                except RepeatedFailureError as e:
+                    st.error(f"⛔ Aborted repeating failed plan: {str(e)}")
+                    return
                 
                 with st.expander("View Tool Results"):
                     for i, result in enumerate(tool_results):
                         st.write(f"**Tool {i+1} Result:**")
-                        if result.success:
-                            st.json(result.data)
+                        if result.is_error:
+                            st.error(result.error or result.data["error"])
                         else:
-                            st.error(result.error)
+                            st.json(result.data)
             else:
                 st.warning("No tools identified for execution.")
                 tool_results = []
             
             # Step 3: Generate response
             st.subheader("📝 AI Response")
-            response = agent.generate_response(
-                query, 
-                tool_results, 
-                analysis.get("processing_strategy", "")
-            )
-            
-            st.markdown(response)
+            st.write_stream(agent.generate_response(analysis, tool_results, use_cache=use_cache))
     
     # Footer
     st.markdown("---")
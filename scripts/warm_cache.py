@@ -0,0 +1,88 @@
+# scripts/warm_cache.py
+"""Pre-answer the planning step of the predefined queries through the OpenAI Batch API.
+
+Batch requests cost half as much as synchronous ones, and the predefined queries are
+the same for every user, so their analyze_query completions can be produced offline
+and written into the LLM disk cache. Run from the repository root, e.g. nightly:
+
+    0 3 * * * cd /path/to/repo && python -m scripts.warm_cache
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+from openai import OpenAI
+
+from agent.llm_cache import CACHE_TTL_SECONDS, cache_key, lookup, store
+from app import PREDEFINED_QUERIES, GitHubAgent
+
+POLL_INTERVAL_SECONDS = 60
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+def main():
+    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+    # Only batch queries whose cached answer is missing or stale
+    requests_by_id = {}
+    for i, query in enumerate(PREDEFINED_QUERIES):
+        request = GitHubAgent.analysis_request(query)
+        key = cache_key(**request)
+        if lookup(key) is None:
+            requests_by_id[f"query-{i}"] = (key, request)
+
+    if not requests_by_id:
+        print("All predefined queries are cached; nothing to do.")
+        return 0
+
+    with tempfile.NamedTemporaryFile("w", suffix=".jsonl", delete=False, encoding="utf-8") as f:
+        for custom_id, (_, request) in requests_by_id.items():
+            f.write(json.dumps({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": request
+            }) + "\n")
+        batch_path = f.name
+
+    try:
+        with open(batch_path, "rb") as f:
+            batch_file = client.files.create(file=f, purpose="batch")
+    finally:
+        os.remove(batch_path)
+
+    batch = client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h"
+    )
+    print(f"Submitted batch {batch.id} with {len(requests_by_id)} requests")
+
+    while batch.status not in TERMINAL_STATUSES:
+        time.sleep(POLL_INTERVAL_SECONDS)
+        batch = client.batches.retrieve(batch.id)
+        print(f"Batch {batch.id}: {batch.status}")
+
+    if batch.status != "completed" or not batch.output_file_id:
+        print(f"Batch {batch.id} ended with status {batch.status}", file=sys.stderr)
+        return 1
+
+    warmed = 0
+    for line in client.files.content(batch.output_file_id).text.splitlines():
+        result = json.loads(line)
+        entry = requests_by_id.get(result["custom_id"])
+        response = result.get("response") or {}
+        if entry is None or response.get("status_code") != 200:
+            continue
+        store(entry[0], response["body"])
+        warmed += 1
+
+    print(f"Cached {warmed}/{len(requests_by_id)} responses (valid for {CACHE_TTL_SECONDS // 3600}h)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
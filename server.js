@@ -90,6 +90,7 @@ const tools = {
                 owner: { type: 'string' },
                 repo: { type: 'string' },
                 sha: { type: 'string', default: 'main' },
+                path: { type: 'string' },
                 per_page: { type: 'number', default: 30 }
             },
             required: ['owner', 'repo']
@@ -228,6 +229,7 @@ const toolImplementations = {
                 owner: args.owner,
                 repo: args.repo,
                 sha: args.sha || 'main',
+                path: args.path,
                 per_page: args.per_page || 30
             });
             